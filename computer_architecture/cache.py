@@ -1,34 +1,73 @@
-from collections import deque
+from array import array
 import logging
 from memory import Memory
 
+# slots of Cache.stats
+HITS = 0
+MISSES = 1
+TIME = 2
+ACCESSES = 3
+
 class Cache:
     def __init__(self, main_memory=None, cache_size=16):
-        logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - Cache: %(message)s'
-                )
         self.logger = logging.getLogger(__name__)
+        self.refresh_log_level()
+
+        if cache_size <= 0 or cache_size & (cache_size - 1):
+            self.logger.error(f"Invalid cache size: {cache_size}")
+            raise ValueError(f"Cache size must be a power of two: {cache_size}")
 
         self.main_memory = main_memory if main_memory else Memory()
         self.cache_size = cache_size
-        self.cache = deque(maxlen=cache_size)
+        # direct-mapped: an address can only live in slot address & mask,
+        # and the slot's tag holds the full address it caches
+        self.mask = cache_size - 1
+        self.tags = array('q', [0] * cache_size)
+        self.data = array('i', [0] * cache_size)
+        self.valid = bytearray(cache_size)
+        # a miss loads the whole aligned line of words around the address;
+        # capped at the cache size so the words of a line never share a slot
+        self.line_words = min(4, cache_size)
         self.enabled = False
-        self.dirty_entries = set()
+        # dirty bit per slot, set by writes and cleared by write-back
+        self.dirty = bytearray(cache_size)
 
-        self.hits = 0
-        self.misses = 0
-        self.total_access_time = 0
-        self.total_accesses = 0
+        # access counters in one int64 buffer that jit.py updates in place
+        self.stats = array('q', [0] * 4)
 
         self.logger.info(f"Cache initialized with size {cache_size}")
 
+    @property
+    def hits(self):
+        return self.stats[HITS]
+
+    @property
+    def misses(self):
+        return self.stats[MISSES]
+
+    @property
+    def total_access_time(self):
+        return self.stats[TIME]
+
+    @property
+    def total_accesses(self):
+        return self.stats[ACCESSES]
+
+    def refresh_log_level(self):
+        # debug messages are only formatted when DEBUG is enabled; call this
+        # again after changing the logger level
+        self._debug = self.logger.isEnabledFor(logging.DEBUG)
+
     def sync_with_memory(self):
+        # explicit flush path: evictions write back their own dirty entries
         try:
-            for entry in self.cache:
-                if entry['address'] in self.dirty_entries:
-                    self.main_memory.write_word(entry['address'], entry['data'])
-            self.dirty_entries.clear()
+            # evicted entries were written back already, so only slots still
+            # marked dirty need writing
+            dirty = self.dirty
+            for index in range(self.cache_size):
+                if dirty[index]:
+                    self.main_memory.write_word(self.tags[index], self.data[index])
+                    dirty[index] = 0
             self.logger.info("Cache synced with main memory")
         except Exception as e:
             self.logger.error(f"Error during memory sync: {str(e)}")
@@ -38,34 +77,52 @@ class Cache:
         if not self.enabled:
             return self.main_memory.read_word(address)
 
-        self.total_accesses += 1
-
-        for entry in self.cache:
-            if entry['address'] == address:
-                self.hits += 1
-                self.total_access_time += 1
+        stats = self.stats
+        stats[ACCESSES] += 1
 
-                self.logger.debug(f"Cache hit: read {entry['data']} from {address}")
-                return entry['data']
+        index = address & self.mask
+        if self.valid[index] and self.tags[index] == address:
+            stats[HITS] += 1
+            stats[TIME] += 1
 
-        self.misses += 1
+            data = self.data[index]
+            if self._debug:
+                self.logger.debug(f"Cache hit: read {data} from {address}")
+            return data
 
-        self.total_access_time += 10
+        stats[MISSES] += 1
+        stats[TIME] += 10
         data = self.main_memory.read_word(address)
         self.update_cache(address, data)
-        self.logger.debug(f"Cache miss: loaded {data} from {address}")
+        self.fill_line(address)
+        if self._debug:
+            self.logger.debug(f"Cache miss: loaded {data} from {address}")
         return data
 
+    def fill_line(self, address):
+        # bring in the rest of the line containing address to exploit spatial
+        # locality; words already cached are kept since they may be dirty
+        base = address & -self.line_words
+        count = min(self.line_words, self.main_memory.size - base)
+        words = self.main_memory.read_words(base, count)
+        for offset, data in enumerate(words):
+            neighbour = base + offset
+            index = neighbour & self.mask
+            if self.valid[index] and self.tags[index] == neighbour:
+                continue
+            self.update_cache(neighbour, data)
+
     def get_cache_status(self):
         try:
-            current_size = len(self.cache)
-            dirty_count = len(self.dirty_entries)
+            current_size = sum(self.valid)
+            dirty_count = sum(self.dirty)
             capacity = self.cache_size
             utilization = (current_size / capacity) * 100 if capacity > 0 else 0
 
-            total_requests = self.hits + self.misses
-            hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
-            avg_access_time = (self.total_access_time / total_requests) if total_requests > 0 else 0
+            hits, misses, total_access_time, _ = self.stats
+            total_requests = hits + misses
+            hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
+            avg_access_time = (total_access_time / total_requests) if total_requests > 0 else 0
 
             status = {
                     'enabled': self.enabled,
@@ -73,9 +130,9 @@ class Cache:
                     'capacity': capacity,
                     'utilization': utilization,
                     'dirty_entries': dirty_count,
-                    'cached_addresses': [entry['address'] for entry in self.cache],
-                    'hits': self.hits,
-                    'misses': self.misses,
+                    'cached_addresses': [self.tags[i] for i in range(self.cache_size) if self.valid[i]],
+                    'hits': hits,
+                    'misses': misses,
                     'hit_rate': f"{hit_rate:.2f}%",
                     'average_access_time': f"{avg_access_time:.2f} units"
                     }
@@ -92,17 +149,34 @@ class Cache:
             self.main_memory.write_word(address, data)
             return
 
+        # write-back with write-allocate: the entry is placed in the cache and
+        # marked dirty, main memory is only updated on eviction or flush
         self.update_cache(address, data)
-        self.dirty_entries.add(address)
-        self.logger.debug(f"Cache write: stored {data} to {address}")
+        self.dirty[address & self.mask] = 1
+        if self._debug:
+            self.logger.debug(f"Cache write: stored {data} to {address}")
 
     def update_cache(self, address, data):
-        self.cache = deque(entry for entry in self.cache if entry['address'] != address)
-
-        self.cache.append({'address': address, 'data': data})
+        index = address & self.mask
+        if self.valid[index] and self.tags[index] != address:
+            # the slot holds another address, write it back before replacing it
+            if self.dirty[index]:
+                evicted_address = self.tags[index]
+                evicted_data = self.data[index]
+                self.main_memory.write_word(evicted_address, evicted_data)
+                self.dirty[index] = 0
+                if self._debug:
+                    self.logger.debug(f"Cache evict: wrote back {evicted_data} to {evicted_address}")
+
+        # data first: an out-of-range word raises before the slot changes
+        self.data[index] = data
+        self.tags[index] = address
+        self.valid[index] = 1
 
     def cache_control(self, code):
         if code == 0:
+            # write back dirty entries so uncached accesses see current data
+            self.flush()
             self.enabled = False
             self.logger.info("Cache disabled")
         elif code == 1:
@@ -116,5 +190,5 @@ class Cache:
 
     def flush(self):
         self.sync_with_memory()
-        self.cache.clear()
+        self.valid[:] = bytes(self.cache_size)
         self.logger.info("Cache flushed")
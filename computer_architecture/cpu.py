@@ -6,266 +6,304 @@ class CPU:
     def __init__(self, cache=None, memory=None):
         # Initialize CPU with 32 general purpose registers, following the MIPS conventions
         # R0 is hardwired to 0, R7 is used for return addresses
-        logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - CPU: %(message)s'
-                )
         self.logger = logging.getLogger(__name__)
+        self.refresh_log_level()
 
         self.memory = memory if memory else Memory()
         self.cache = cache if cache else Cache()
         self.pc = 0
-        self.registers = {}
-        for i in range(32):
-            self.registers[f"R{i}"] = 0
-
-        # R0 should always be 0
-        self.registers['R0'] = 0
+        # registers are indexed by number; the parser turns "R5" into 5
+        # R0 stays 0 because no instruction writes to index 0
+        self.registers = [0] * 32
         self.running = True
+
+        # opcode -> handler table, built once so dispatch is a single lookup
+        self._dispatch = {
+                "ADD": self.execute_add,
+                "ADDI": self.execute_addi,
+                "SUB": self.execute_sub,
+                "SLT": self.execute_slt,
+                "BNE": self.execute_bne,
+                "J": self.execute_jump,
+                "JAL": self.execute_jal,
+                "LW": self.execute_lw,
+                "SW": self.execute_sw,
+                "CACHE": self.execute_cache,
+                "HALT": self._halt,
+                }
+        # program -> compiled basic blocks, see compile_program
+        self._compiled = {}
+
         self.logger.info("CPU initialized")
-        self.logger.debug(f"Initial register state: {self.registers}")
+        if self._debug:
+            self.logger.debug(f"Initial register state: {self.registers}")
+
+    def refresh_log_level(self):
+        # debug messages are only formatted when DEBUG is enabled; call this
+        # again after changing the logger level
+        self._debug = self.logger.isEnabledFor(logging.DEBUG)
 
     def reset(self):
         # reset the CPU to initial state
         self.pc = 0
-        for reg in self.registers:
-            self.registers[reg] = 0
+        for i in range(len(self.registers)):
+            self.registers[i] = 0
         self.running = True
         self.logger.info("CPU reset")
         
+    def run(self, program):
+        # run a parsed program; the PC selects the next instruction, so
+        # branches and jumps take effect
+        while self.running:
+            index = self.pc // 4
+            if not 0 <= index < len(program):
+                break
+            self.execute_instruction(program[index])
+
+    def run_compiled(self, program):
+        # same as run, but executes whole basic blocks generated by
+        # compile_program; self.pc is only updated between blocks
+        blocks = self.compile_program(program)
+        while self.running:
+            block = blocks.get(self.pc)
+            if block is None:
+                break
+            self.pc = block(self, self.registers, self.cache)
+
+    def compile_program(self, program):
+        # generate one Python function per basic block of the program and
+        # return them keyed by start PC; each block returns the next PC
+        key = tuple(program)
+        if key in self._compiled:
+            return self._compiled[key]
+
+        # blocks start at 0, at branch/jump targets and after control flow
+        leaders = {0}
+        for index, (operation, operands) in enumerate(program):
+            if operation == "BNE":
+                leaders.add(index + 1 + operands[2])
+                leaders.add(index + 1)
+            elif operation in ("J", "JAL"):
+                leaders.add(operands[0])
+                leaders.add(index + 1)
+            elif operation == "HALT":
+                leaders.add(index + 1)
+
+        lines = []
+        starts = []
+        for index, (operation, operands) in enumerate(program):
+            pc = index * 4
+            if index in leaders:
+                starts.append(pc)
+                lines.append(f"def _block_{pc}(cpu, regs, cache):")
+            lines.append(f"    # {operation} {operands}")
+            lines.extend("    " + line for line in self._generate(operation, operands, pc))
+            if index + 1 in leaders or index + 1 == len(program):
+                # falls through into the next block
+                if operation not in ("BNE", "J", "JAL", "HALT"):
+                    lines.append(f"    return {pc + 4}")
+
+        source = "\n".join(lines) + "\n"
+        namespace = {}
+        exec(compile(source, "<compiled program>", "exec"), namespace)
+        blocks = {pc: namespace[f"_block_{pc}"] for pc in starts}
+
+        self._compiled[key] = blocks
+        self.logger.info(f"Compiled {len(program)} instructions into {len(blocks)} blocks")
+        return blocks
+
+    def _generate(self, operation, operands, pc):
+        # source lines for a single instruction inside a block
+        if operation in ("ADD", "SUB", "SLT"):
+            rd, rs, rt = operands
+            if not rd:
+                return ["pass"]
+            if operation == "ADD":
+                return [f"regs[{rd}] = regs[{rs}] + regs[{rt}]"]
+            if operation == "SUB":
+                return [f"regs[{rd}] = regs[{rs}] - regs[{rt}]"]
+            return [f"regs[{rd}] = 1 if regs[{rs}] < regs[{rt}] else 0"]
+        if operation == "ADDI":
+            rt, rs, immd = operands
+            return [f"regs[{rt}] = regs[{rs}] + {immd}"] if rt else ["pass"]
+        if operation == "BNE":
+            rs, rt, offset = operands
+            return [f"return {pc + 4 + offset * 4} if regs[{rs}] != regs[{rt}] else {pc + 4}"]
+        if operation == "J":
+            return [f"return {operands[0] * 4}"]
+        if operation == "JAL":
+            return [f"regs[7] = {pc + 4}", f"return {operands[0] * 4}"]
+        if operation == "LW":
+            rt, offset, rs = operands
+            load = f"cache.cache_read(regs[{rs}] + {offset})"
+            return [f"regs[{rt}] = {load}"] if rt else [load]
+        if operation == "SW":
+            rt, offset, rs = operands
+            return [f"cache.cache_write(regs[{rs}] + {offset}, regs[{rt}])"]
+        if operation == "CACHE":
+            return [f"cache.cache_control({operands[0]})"]
+        if operation == "HALT":
+            return ["cpu._halt(())", f"return {pc}"]
+        # unknown operations only fail when reached, as in execute_instruction
+        return [f"raise ValueError({f'Unknown operation: {operation}'!r})"]
+
     def fetch_instruction(self, instruction):
-        # parse an instruction
-        try:
-            parts = instruction.strip().split(',')
-            operation = parts[0]
-            operands = parts[1:] if len(parts) > 1 else []
+        # instructions arrive pre-parsed as (operation, operands)
+        operation, operands = instruction
 
+        if self._debug:
             self.logger.debug(f"Fetched instruction: {operation} with operands {operands}")
-            return operation, operands
-        except Exception as e:
-            self.logger.error(f"Error fetching instruction: {str(e)}") 
-            raise
+        return operation, operands
 
     def execute_instruction(self, instruction):
         # execute an instruction
         try:
             operation, operands = self.fetch_instruction(instruction)
 
-            if operation == "ADD":
-                self.execute_add(operands)
-            elif operation == "ADDI":
-                self.execute_addi(operands)
-            elif operation == "SUB":
-                self.execute_sub(operands)
-            elif operation == "SLT":
-                self.execute_slt(operands)
-            elif operation == "BNE":
-                self.execute_bne(operands)
-            elif operation == "J":
-                self.execute_jump(operands)
-            elif operation == "JAL":
-                self.execute_jal(operands)
-            elif operation == "LW":
-                self.execute_lw(operands)
-            elif operation == "SW":
-                self.execute_sw(operands)
-            elif operation == "CACHE":
-                self.execute_cache(operands)
-            elif operation == "HALT":
-                self.running = False
-                self.logger.info("CPU Halted")
-            else:
+            handler = self._dispatch.get(operation)
+            if handler is None:
                 self.logger.error(f"Unknown operation: {operation}")
                 raise ValueError(f"Unknown operation: {operation}")
+            handler(operands)
 
         except Exception as e:
-            self.logger.error(f"Error executing instruction: {str(e)}")
+            self.logger.error(f"Error executing instruction at PC {self.pc}: {str(e)}")
             raise
 
+    def _halt(self, _operands):
+        self.running = False
+        self.logger.info("CPU Halted")
+
     def execute_add(self, operands):
         # ADD Rd, Rs, Rt
         # Rd = Rs + Rt
-        try:
-            rd, rs, rt = operands
-            rs_value = self.registers[rs]
-            rt_value = self.registers[rt]
-            result = rs_value + rt_value
-
-            if rd != 'R0':
-                self.registers[rd] = result
+        rd, rs, rt = operands
+        rs_value = self.registers[rs]
+        rt_value = self.registers[rt]
+        result = rs_value + rt_value
 
-            self.logger.debug(f"ADD: {rd} = {rs}({rs_value}) + {rt}({rt_value}) = {result}")
-            self.pc += 4 # increment program counter
+        if rd:
+            self.registers[rd] = result
 
-        except Exception as e:
-            self.logger.error(f"Error executing ADD: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"ADD: R{rd} = R{rs}({rs_value}) + R{rt}({rt_value}) = {result}")
+        self.pc += 4 # increment program counter
 
     def execute_addi(self, operands):
         # ADDI Rd, Rs, immd
         # Rd = Rs + immd
-        try:
-            rt, rs, immd = operands
-            rs_value = self.registers[rs]
-            immd_value = int(immd)
-            result = rs_value + immd_value
+        rt, rs, immd = operands
+        rs_value = self.registers[rs]
+        result = rs_value + immd
 
-            if rt != 'R0':
-                self.registers[rt] = result
+        if rt:
+            self.registers[rt] = result
 
-            self.logger.debug(f"ADDI: {rt} = {rs}({rs_value}) + {immd} = {result}")
-            self.pc += 4 
-
-        except Exception as e:
-            self.logger.error(f"Error executing ADDI: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"ADDI: R{rt} = R{rs}({rs_value}) + {immd} = {result}")
+        self.pc += 4 
 
     def execute_sub(self, operands):
         # SUB Rd, Rs, Rt
         # Rd = Rs - Rt
-        try:
-            rd, rs, rt = operands
-            rs_value = self.registers[rs]
-            rt_value = self.registers[rt]
-            result = rs_value - rt_value
-
-            if rd != 'R0':
-                self.registers[rd] = result
+        rd, rs, rt = operands
+        rs_value = self.registers[rs]
+        rt_value = self.registers[rt]
+        result = rs_value - rt_value
 
-            self.logger.debug(f"SUB: {rd} = {rs}({rs_value}) - {rt}({rt_value}) = {result}")
-            self.pc += 4 
+        if rd:
+            self.registers[rd] = result
 
-        except Exception as e:
-            self.logger.error(f"Error executing SUB: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"SUB: R{rd} = R{rs}({rs_value}) - R{rt}({rt_value}) = {result}")
+        self.pc += 4 
 
     def execute_slt(self, operands):
         # SLT Rd, Rs, Rt
         # If (Rs < Rt) then Rd = 1 else Rd = 0
-        try:
-            rd, rs, rt = operands
-            rs_value = self.registers[rs]
-            rt_value = self.registers[rt]
+        rd, rs, rt = operands
+        rs_value = self.registers[rs]
+        rt_value = self.registers[rt]
 
-            result = 1 if rs_value < rt_value else 0
+        result = 1 if rs_value < rt_value else 0
 
-            if rd != 'R0':
-                self.registers[rd] = result
+        if rd:
+            self.registers[rd] = result
 
-            self.logger.debug(f"SLT: {rd} = ({rs}({rs_value}) < {rt}({rt_value})) = {result}")
-            self.pc += 4 
-
-        except Exception as e:
-            self.logger.error(f"Error executing SLT: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"SLT: R{rd} = (R{rs}({rs_value}) < R{rt}({rt_value})) = {result}")
+        self.pc += 4 
         
     def execute_bne(self, operands):
         # BNE Rs, Rt, offset
         # If Rs != Rt then branch to PC + 4 + offset
-        try:
-            rs, rt, offset = operands
-            rs_value = self.registers[rs]
-            rt_value = self.registers[rt]
-            offset_value = int(offset)
+        rs, rt, offset = operands
+        rs_value = self.registers[rs]
+        rt_value = self.registers[rt]
 
-            self.pc += 4
+        self.pc += 4
 
-            if rs_value != rt_value:
-                self.pc += (offset_value * 4) # branch taken
+        if rs_value != rt_value:
+            self.pc += (offset * 4) # branch taken
+            if self._debug:
                 self.logger.debug(f"BNE: branch taken. New PC = {self.pc}")
-            else:
-                self.logger.debug(f"BNE: branch not taken. PC = {self.pc}")
-
-        except Exception as e:
-            self.logger.error(f"Error executing BNE: {str(e)}")
-            raise
+        elif self._debug:
+            self.logger.debug(f"BNE: branch not taken. PC = {self.pc}")
 
     def execute_jump(self, operands):
         # J target
         # Jump to target address
-        try:
-            target = int(operands[0])
-            self.pc = target * 4 # target is an address, so multiply by 4
+        target = operands[0]
+        self.pc = target * 4 # target is an address, so multiply by 4
+        if self._debug:
             self.logger.debug(f"JUMP: New PC = {self.pc}")
 
-        except Exception as e:
-            self.logger.error(f"Error executing JUMP: {str(e)}")
-            raise
-
     def execute_jal(self, operands):
         # JAL target
         # Jump to target address and save return address in R7
-        try:
-            target = int(operands[0])
-
-            self.registers['R7'] = self.pc + 4
-            self.pc = target * 4
+        target = operands[0]
 
-            self.logger.debug(f"JAL: Return address {self.registers['R7']} stored in R7. New PC = {self.pc}")
+        self.registers[7] = self.pc + 4
+        self.pc = target * 4
 
-        except Exception as e:
-            self.logger.error(f"Error executing JAL: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"JAL: Return address {self.registers[7]} stored in R7. New PC = {self.pc}")
 
     def execute_lw(self, operands):
         # LW Rt, offset(Rs)
         # Load word from memory at address Rs + offset into Rt
-        try:
-            rt = operands[0]
-            offset_rs = operands[1]
-
-            offset_str = offset_rs.split('(')[0]
-            rs = offset_rs.split('(')[1].rstrip(')')
-
-            offset_value = int(offset_str)
-            rs_value = self.registers[rs]
-            address = rs_value + offset_value
-
-            value = self.cache.cache_read(address)
+        rt, offset_value, rs = operands
+        rs_value = self.registers[rs]
+        address = rs_value + offset_value
 
-            if rt != 'R0':
-                self.registers[rt] = value
+        value = self.cache.cache_read(address)
 
-            self.logger.debug(f"LW: {rt} = MEM[{rs}({rs_value}) + {offset_value}] = {value}")
-            self.pc += 4
+        if rt:
+            self.registers[rt] = value
 
-        except Exception as e:
-            self.logger.error(f"Error executing LW: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"LW: R{rt} = MEM[R{rs}({rs_value}) + {offset_value}] = {value}")
+        self.pc += 4
 
     def execute_sw(self, operands):
         # SW Rt, offset(Rs)
         # Store word from Rt to memory at address Rs + offset
-        try:
-            rt = operands[0]
-            offset_rs = operands[1]
-
-            offset_str = offset_rs.split('(')[0]
-            rs = offset_rs.split('(')[1].rstrip(')')
+        rt, offset_value, rs = operands
+        rs_value = self.registers[rs]
+        address = rs_value + offset_value
 
-            offset_value = int(offset_str)
-            rs_value = self.registers[rs]
-            address = rs_value + offset_value
+        rt_value = self.registers[rt]
+        self.cache.cache_write(address, rt_value)
 
-            rt_value = self.registers[rt]
-            self.cache.cache_write(address, rt_value)
-
-            self.logger.debug(f"SW: MEM[{rs}({rs_value}) + {offset_value}] = {rt}({rt_value})")
-            self.pc += 4
-
-        except Exception as e:
-            self.logger.error(f"Error executing SW: {str(e)}")
-            raise
+        if self._debug:
+            self.logger.debug(f"SW: MEM[R{rs}({rs_value}) + {offset_value}] = R{rt}({rt_value})")
+        self.pc += 4
 
     def execute_cache(self, operands):
         # Cache Code
         # Code = 0: Disable Cache, Code = 1: Enable Cache, Code = 2: Flush Cache
-        try:
-            code = int(operands[0])
-            self.cache.cache_control(code)
+        code = operands[0]
+        self.cache.cache_control(code)
+        if self._debug:
             self.logger.debug(f"CACHE: Control code {code} executed")
-            self.pc += 4
-
-        except Exception as e:
-            self.logger.error(f"Error executing CACHE: {str(e)}")
-            raise
+        self.pc += 4
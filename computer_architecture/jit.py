@@ -0,0 +1,270 @@
+# Numba-compiled execution loop for long-running programs
+# The whole fetch/execute loop runs in nopython mode over flat arrays, and the
+# CPU and cache objects are synced back once the program stops.
+# Numba and NumPy are optional: without them NUMBA_AVAILABLE is False and
+# callers fall back to CPU.run_compiled or CPU.run.
+import logging
+from cache import HITS, MISSES, TIME, ACCESSES
+
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+OPCODES = {
+        "ADD": 0,
+        "ADDI": 1,
+        "SUB": 2,
+        "SLT": 3,
+        "BNE": 4,
+        "J": 5,
+        "JAL": 6,
+        "LW": 7,
+        "SW": 8,
+        "CACHE": 9,
+        "HALT": 10,
+        }
+
+# kernel exit status
+STATUS_END = 0
+STATUS_HALTED = 1
+STATUS_BAD_CACHE_CODE = 2
+STATUS_BAD_ADDRESS = 3
+STATUS_OVERFLOW = 4
+
+# slots of the cache state array; counters live in Cache.stats
+ENABLED = 0
+LINE_WORDS = 1
+
+logger = logging.getLogger(__name__)
+
+def encode_program(program):
+    # pack (operation, operands) tuples into one contiguous int32 array of
+    # (opcode, a, b, c) rows, e.g. ADD -> (0, rd, rs, rt), LW -> (7, rt, offset, rs);
+    # unused operand slots are -1
+    rows = []
+    for operation, operands in program:
+        if operation not in OPCODES:
+            raise ValueError(f"Unknown operation: {operation}")
+        row = [OPCODES[operation], -1, -1, -1]
+        row[1:1 + len(operands)] = operands
+        rows.append(row)
+    return np.array(rows, dtype=np.int32).reshape(-1, 4)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _mem_read(mem, address):
+        if address < 0 or address >= mem.shape[0]:
+            return np.int64(0), STATUS_BAD_ADDRESS
+        return np.int64(mem[address]), STATUS_END
+
+    @njit(cache=True)
+    def _mem_write(mem, address, value):
+        if address < 0 or address >= mem.shape[0]:
+            return STATUS_BAD_ADDRESS
+        if value > 0x7FFFFFFF or value < -0x80000000:
+            return STATUS_OVERFLOW
+        mem[address] = value
+        return STATUS_END
+
+    @njit(cache=True)
+    def _cache_fill(mem, cache_tags, cache_data, cache_valid, cache_dirty,
+                    index, address):
+        # claim slot index for address, writing back the entry it replaces
+        if cache_valid[index] and cache_tags[index] != address:
+            if cache_dirty[index]:
+                status = _mem_write(mem, cache_tags[index], cache_data[index])
+                if status != STATUS_END:
+                    return status
+                cache_dirty[index] = 0
+        return STATUS_END
+
+    @njit(cache=True)
+    def _cache_read(mem, cache_tags, cache_data, cache_valid, cache_dirty,
+                    state, stats, address):
+        if not state[ENABLED]:
+            return _mem_read(mem, address)
+
+        stats[ACCESSES] += 1
+        index = address & (cache_tags.shape[0] - 1)
+        if cache_valid[index] and cache_tags[index] == address:
+            stats[HITS] += 1
+            stats[TIME] += 1
+            return np.int64(cache_data[index]), STATUS_END
+
+        stats[MISSES] += 1
+        stats[TIME] += 10
+        data, status = _mem_read(mem, address)
+        if status != STATUS_END:
+            return data, status
+        status = _cache_fill(mem, cache_tags, cache_data, cache_valid,
+                             cache_dirty, index, address)
+        if status != STATUS_END:
+            return data, status
+        cache_data[index] = data
+        cache_tags[index] = address
+        cache_valid[index] = 1
+
+        # rest of the line, as in Cache.fill_line
+        line_words = state[LINE_WORDS]
+        base = address & -line_words
+        for neighbour in range(base, min(base + line_words, mem.shape[0])):
+            index = neighbour & (cache_tags.shape[0] - 1)
+            if cache_valid[index] and cache_tags[index] == neighbour:
+                continue
+            status = _cache_fill(mem, cache_tags, cache_data, cache_valid,
+                                 cache_dirty, index, neighbour)
+            if status != STATUS_END:
+                return data, status
+            cache_data[index] = mem[neighbour]
+            cache_tags[index] = neighbour
+            cache_valid[index] = 1
+        return data, STATUS_END
+
+    @njit(cache=True)
+    def _cache_write(mem, cache_tags, cache_data, cache_valid, cache_dirty,
+                     state, address, data):
+        if not state[ENABLED]:
+            return _mem_write(mem, address, data)
+
+        index = address & (cache_tags.shape[0] - 1)
+        status = _cache_fill(mem, cache_tags, cache_data, cache_valid,
+                             cache_dirty, index, address)
+        if status != STATUS_END:
+            return status
+        if data > 0x7FFFFFFF or data < -0x80000000:
+            return STATUS_OVERFLOW
+        cache_data[index] = data
+        cache_tags[index] = address
+        cache_valid[index] = 1
+        cache_dirty[index] = 1
+        return STATUS_END
+
+    @njit(cache=True)
+    def _cache_flush(mem, cache_tags, cache_data, cache_valid, cache_dirty):
+        for i in range(cache_tags.shape[0]):
+            if cache_valid[i] and cache_dirty[i]:
+                status = _mem_write(mem, cache_tags[i], cache_data[i])
+                if status != STATUS_END:
+                    return status
+                cache_dirty[i] = 0
+        cache_valid[:] = 0
+        return STATUS_END
+
+    @njit(cache=True)
+    def _run(program, regs, mem, cache_tags, cache_data, cache_valid,
+             cache_dirty, state, stats, pc):
+        # returns (pc, status); pc is left on the failing instruction on error
+        count = program.shape[0]
+        while pc >= 0 and pc // 4 < count:
+            index = pc // 4
+            op = program[index, 0]
+            a = program[index, 1]
+            b = program[index, 2]
+            c = program[index, 3]
+
+            if op == 0: # ADD
+                if a:
+                    regs[a] = regs[b] + regs[c]
+                pc += 4
+            elif op == 1: # ADDI
+                if a:
+                    regs[a] = regs[b] + c
+                pc += 4
+            elif op == 2: # SUB
+                if a:
+                    regs[a] = regs[b] - regs[c]
+                pc += 4
+            elif op == 3: # SLT
+                if a:
+                    regs[a] = 1 if regs[b] < regs[c] else 0
+                pc += 4
+            elif op == 4: # BNE
+                pc += 4
+                if regs[a] != regs[b]:
+                    pc += c * 4
+            elif op == 5: # J
+                pc = a * 4
+            elif op == 6: # JAL
+                regs[7] = pc + 4
+                pc = a * 4
+            elif op == 7: # LW
+                value, status = _cache_read(mem, cache_tags, cache_data,
+                                            cache_valid, cache_dirty, state,
+                                            stats, regs[c] + b)
+                if status != STATUS_END:
+                    return pc, status
+                if a:
+                    regs[a] = value
+                pc += 4
+            elif op == 8: # SW
+                status = _cache_write(mem, cache_tags, cache_data,
+                                      cache_valid, cache_dirty, state,
+                                      regs[c] + b, regs[a])
+                if status != STATUS_END:
+                    return pc, status
+                pc += 4
+            elif op == 9: # CACHE
+                if a == 0:
+                    status = _cache_flush(mem, cache_tags, cache_data, cache_valid,
+                                          cache_dirty)
+                    if status != STATUS_END:
+                        return pc, status
+                    state[ENABLED] = 0
+                elif a == 1:
+                    state[ENABLED] = 1
+                elif a == 2:
+                    status = _cache_flush(mem, cache_tags, cache_data, cache_valid,
+                                          cache_dirty)
+                    if status != STATUS_END:
+                        return pc, status
+                else:
+                    return pc, STATUS_BAD_CACHE_CODE
+                pc += 4
+            else: # HALT
+                return pc, STATUS_HALTED
+        return pc, STATUS_END
+
+def run_program(cpu, encoded):
+    # run a program packed by encode_program to completion on the compiled loop
+    if not NUMBA_AVAILABLE:
+        raise RuntimeError("Numba is not installed")
+
+    cache = cpu.cache
+    memory = cache.main_memory
+
+    regs = np.array(cpu.registers, dtype=np.int64)
+    # shares the Memory buffer, so stores land in memory.memory directly
+    mem = np.frombuffer(memory.memory, dtype=np.intc)
+
+    # tags, data, valid and dirty bits and counters share the Cache buffers as well
+    cache_tags = np.frombuffer(cache.tags, dtype=np.int64)
+    cache_data = np.frombuffer(cache.data, dtype=np.intc)
+    cache_valid = np.frombuffer(cache.valid, dtype=np.uint8)
+    cache_dirty = np.frombuffer(cache.dirty, dtype=np.uint8)
+    state = np.array([cache.enabled, cache.line_words], dtype=np.int64)
+    stats = np.frombuffer(cache.stats, dtype=np.int64)
+
+    pc, status = _run(encoded, regs, mem, cache_tags, cache_data,
+                      cache_valid, cache_dirty, state, stats, cpu.pc)
+
+    cpu.pc = int(pc)
+    cpu.registers[:] = regs.tolist()
+    if status == STATUS_HALTED:
+        cpu.running = False
+        logger.info("CPU Halted")
+
+    cache.enabled = bool(state[ENABLED])
+
+    if status == STATUS_BAD_CACHE_CODE:
+        code = int(encoded[cpu.pc // 4, 1])
+        logger.error(f"Invalid cache control code: {code}")
+        raise ValueError(f"Invalid cache control code: {code}")
+    if status == STATUS_BAD_ADDRESS:
+        logger.error(f"Memory access error at PC {cpu.pc}")
+        raise MemoryError(f"Address exceeds memory size {memory.size}")
+    if status == STATUS_OVERFLOW:
+        logger.error(f"Overflow error at PC {cpu.pc}")
+        raise OverflowError("Value exceeds 32-bit bounds")
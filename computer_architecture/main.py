@@ -1,7 +1,13 @@
 import logging
+import re
+import sys
 from cpu import CPU
 from cache import Cache
 from memory import Memory
+from jit import NUMBA_AVAILABLE, encode_program, run_program
+
+# offset(Rs) operand of LW/SW, e.g. "-4(R2)"
+MEMORY_OPERAND = re.compile(r'(-?\d+)\((R\d+)\)')
 
 def read_instructions(filename):
     try:
@@ -14,10 +20,47 @@ def read_instructions(filename):
         logging.error(f"Error reading instructions: {str(e)}")
         raise
 
+def parse_register(token):
+    # "R5" -> 5, so the CPU can index its register file directly
+    if not token.startswith('R'):
+        raise ValueError(f"Invalid register: {token}")
+    index = int(token[1:])
+    if not 0 <= index < 32:
+        raise ValueError(f"Invalid register: {token}")
+    return index
+
+def parse_instruction(line):
+    # parse a source line once into (operation, operands) so the CPU does
+    # no string work while executing
+    parts = [part.strip() for part in line.strip().split(',')]
+    # interned so opcode lookups in the CPU dispatch table match by identity
+    operation = sys.intern(parts[0])
+    operands = parts[1:]
+
+    if operation in ("LW", "SW"):
+        # LW/SW Rt, offset(Rs) -> (Rt, offset, Rs)
+        rt, offset_rs = operands
+        match = MEMORY_OPERAND.fullmatch(offset_rs)
+        if match is None:
+            raise ValueError(f"Invalid memory operand: {offset_rs}")
+        offset, rs = match.groups()
+        return operation, (parse_register(rt), int(offset), parse_register(rs))
+    if operation in ("ADDI", "BNE"):
+        # ADDI Rt, Rs, immd / BNE Rs, Rt, offset
+        first, second, immd = operands
+        return operation, (parse_register(first), parse_register(second), int(immd))
+    if operation in ("J", "JAL", "CACHE"):
+        return operation, (int(operands[0]),)
+    if operation == "HALT":
+        return operation, ()
+    if operation in ("ADD", "SUB", "SLT"):
+        return operation, tuple(parse_register(operand) for operand in operands)
+    return operation, tuple(operands)
+
 def main():
     logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - Main: %(message)s'
+            format='%(asctime)s - %(levelname)s - %(name)s: %(message)s'
             )
     logger = logging.getLogger(__name__)
 
@@ -27,15 +70,15 @@ def main():
         cpu = CPU(memory=memory, cache=cache)
 
         instructions = read_instructions("instruction_input.txt")
-        logger.info(f"Loaded {len(instructions)} instructions")
+        program = [parse_instruction(line) for line in instructions]
+        logger.info(f"Loaded {len(program)} instructions")
 
-        instruction_count = 0
-        while cpu.running and instruction_count < len(instructions):
-            current_instruction = instructions[instruction_count]
-            cpu.execute_instruction(current_instruction)
-            instruction_count += 1
+        if NUMBA_AVAILABLE:
+            run_program(cpu, encode_program(program))
+        else:
+            cpu.run_compiled(program)
 
-        logger.info(f"Program completed. Executed {instruction_count} instructions")
+        logger.info(f"Program completed. Final PC = {cpu.pc}")
 
         cache_stats = cache.get_cache_status()
         logger.info(f"Final cache statistics: {cache_stats}")
@@ -1,21 +1,24 @@
 # class object representation of computer memory
 import logging
+from array import array
 
 class Memory:
     def __init__(self, data_file="data_input.txt", size=1024):
-
-        logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - Memory: %(message)s'
-                )
         self.logger = logging.getLogger(__name__)
+        self.refresh_log_level()
 
         self.size = size
-        self.memory = {}
-        self.initial_state = {}
+        # one signed 32-bit word per address, stored contiguously
+        self.memory = array('i', [0] * size)
+        self.initial_state = array('i', [0] * size)
         self.initialize_memory(data_file)
         self.logger.info(f"Memory initialized with {size} bytes")
 
+    def refresh_log_level(self):
+        # debug messages are only formatted when DEBUG is enabled; call this
+        # again after changing the logger level
+        self._debug = self.logger.isEnabledFor(logging.DEBUG)
+
     def initialize_memory(self, filename):
         try:
             with open(filename, 'r') as file:
@@ -36,7 +39,7 @@ class Memory:
 
     def check_bounds(self, address):
         address_int = int(address, 2) if isinstance(address, str) else address
-        if address_int >= self.size:
+        if address_int < 0 or address_int >= self.size:
             self.logger.error(f"Memory access error: Address {address} exceeds memory size {self.size}")
             raise MemoryError(f"Address {address} exceeds memory size {self.size}")
         return address_int
@@ -50,21 +53,39 @@ class Memory:
             raise OverflowError("Value exceeds 32-bit bounds")
 
     def read_word(self, address):
-        address_int = self.check_bounds(address)
-        value = self.memory.get(address_int, 0)
-        self.logger.debug(f"Read value {value} from address {address}")
+        # hot path: addresses are already ints, check_bounds is for parsing
+        if not 0 <= address < self.size:
+            self.logger.error(f"Memory access error: Address {address} exceeds memory size {self.size}")
+            raise MemoryError(f"Address {address} exceeds memory size {self.size}")
+        value = self.memory[address]
+        if self._debug:
+            self.logger.debug(f"Read value {value} from address {address}")
         return value
 
+    def read_words(self, start, count):
+        # contiguous block of words, copied out of the array in one slice
+        end = start + count
+        if start < 0 or end > self.size:
+            self.logger.error(f"Memory access error: Block {start}+{count} exceeds memory size {self.size}")
+            raise MemoryError(f"Block {start}+{count} exceeds memory size {self.size}")
+        if self._debug:
+            self.logger.debug(f"Read {count} values from address {start}")
+        return self.memory[start:end]
+
     def write_word(self, address, value):
-        address_int = self.check_bounds(address)
-        self.check_value(value)
-        self.memory[address_int] = value
-        self.logger.debug(f"Wrote value {value} to address {address}")
+        if not 0 <= address < self.size:
+            self.logger.error(f"Memory access error: Address {address} exceeds memory size {self.size}")
+            raise MemoryError(f"Address {address} exceeds memory size {self.size}")
+        # the int32 array raises OverflowError/TypeError itself
+        self.memory[address] = value
+        if self._debug:
+            self.logger.debug(f"Wrote value {value} to address {address}")
 
     def flush(self):
-        self.memory.clear()
+        for i in range(self.size):
+            self.memory[i] = 0
         self.logger.info("Memory flushed")
 
     def reset_to_initial(self):
-        self.memory = self.initial_state.copy()
+        self.memory[:] = self.initial_state
         self.logger.info("Memory reset to initial state")